@@ -0,0 +1,39 @@
+// Resident worker for cli_wrapper_proxy.py.
+// Loads cli-wrapper.js once, then serves JSON requests line-by-line over
+// stdin/stdout so Python never pays Node startup + require() per call.
+const readline = require('readline');
+const wrapper = require('./cli-wrapper.js');
+
+const rl = readline.createInterface({ input: process.stdin, terminal: false });
+
+// Token accounting happens on the Python side; responses carry only the
+// result itself.
+function handle(req) {
+  const models = req.models || ['claude', 'gemini', 'kimi', 'codex'];
+  wrapper.callWithFallback(models, req.prompt)
+    .then(result => {
+      process.stdout.write(JSON.stringify({
+        id: req.id,
+        ok: result.ok,
+        text: result.ok ? result.text : null,
+        error: result.ok ? null : (result.errors || 'Unknown error')
+      }) + '\n');
+    })
+    .catch(err => {
+      process.stdout.write(JSON.stringify({
+        id: req.id, ok: false, text: null, error: err.message
+      }) + '\n');
+    });
+}
+
+rl.on('line', (line) => {
+  let req;
+  try { req = JSON.parse(line); } catch (err) { return; }
+  if (Array.isArray(req.batch)) {
+    // Coalesced burst from the proxy: dispatch every item concurrently;
+    // each one writes its own id-tagged response line when it settles.
+    req.batch.forEach(handle);
+  } else {
+    handle(req);
+  }
+});
@@ -4,12 +4,106 @@ CLI Wrapper Proxy for ClawWork
 Routes OpenAI API calls to subscription CLIs (Claude, Gemini, Kimi, Codex)
 """
 
+import asyncio
+import collections
+import hashlib
+import itertools
+import logging
 import subprocess
 import json
+import orjson
 import os
+import select
+import shutil
 import sys
+import threading
+import time
 from typing import Optional, Dict, Any
-from datetime import datetime
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+logger = logging.getLogger('clawwork.proxy')
+
+# Resident worker script shipped next to this file; it requires
+# cli-wrapper.js once, then serves JSON requests line-by-line over
+# stdin/stdout so we never pay Node startup + require() cost per call.
+_WORKER_JS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cli-wrapper-worker.js')
+
+def _cli_error(message: str) -> Dict[str, Any]:
+    """Build a failed CLI wrapper result."""
+    return {
+        'ok': False,
+        'text': None,
+        'error': message,
+        'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+    }
+
+class SemanticCache:
+    """
+    Embedding-similarity cache for paraphrased prompts.
+    Returns a stored response when cosine similarity beats the threshold.
+    Needs sentence-transformers + numpy; disables itself with a warning
+    if the imports fail, since the cache is an explicit opt-in.
+    """
+
+    def __init__(self, threshold: float = 0.92):
+        self.threshold = threshold
+        self._model = None
+        self._disabled = False
+        self._vectors = None  # [N, 384] float32, rows L2-normalized
+        self._responses = []
+        self._lock = threading.Lock()
+
+    def _encode(self, prompt: str):
+        """Embed prompt as a unit vector, or None if the model is unavailable."""
+        if self._disabled:
+            return None
+        if self._model is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer('all-MiniLM-L6-v2')
+            except ImportError as e:
+                self._disabled = True
+                logger.warning(
+                    "CLAWWORK_SEMANTIC_CACHE=1 but its dependencies are "
+                    "missing (%s); semantic cache disabled — install "
+                    "sentence-transformers to enable it", e)
+                return None
+        import numpy as np
+        vec = self._model.encode(prompt).astype('float32')
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm else vec
+
+    def get(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """Return the closest cached response, or None below the threshold."""
+        vec = self._encode(prompt)
+        if vec is None:
+            return None
+        with self._lock:
+            if self._vectors is None:
+                return None
+            sims = self._vectors @ vec
+            best = int(sims.argmax())
+            if sims[best] > self.threshold:
+                return self._responses[best]
+        return None
+
+    def put(self, prompt: str, response: Dict[str, Any]) -> None:
+        """Store a (vector, response) pair for later similarity lookups."""
+        vec = self._encode(prompt)
+        if vec is None:
+            return
+        import numpy as np
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = vec.reshape(1, -1)
+            else:
+                self._vectors = np.vstack([self._vectors, vec])
+            self._responses.append(response)
+
 
 class CLIWrapperProxy:
     """Proxy OpenAI API calls to subscription CLI tools."""
@@ -17,98 +111,281 @@ class CLIWrapperProxy:
     def __init__(self):
         self.cli_wrapper_path = os.path.expanduser("~/.openclaw/bot/src/tools/cli-wrapper.js")
         self.node_path = self._find_node()
-        self.call_count = 0
+        self._compl_ids = itertools.count(1)
+        self._chat_ids = itertools.count(1)
+        self._child_env = self._clean_env()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._read_buf = b''
+        self._request_seq = 0
+        self._aworker = None
+        self._pending = None
+        self._batcher_task = None
+        self._reader_task = None
+        self._inflight = {}
+        self._batch_window = 0.02
+        self._batch_max = 32
+        self._request_timeout = 300.0
+        self._cache = collections.OrderedDict()
+        self._cache_max = 1024
+        self._cache_ttl = 3600
+        # Shared cache across uvicorn workers; enabled when REDIS_URL is
+        # set and the redis package is installed.
+        self._redis = None
+        if aioredis is not None and os.getenv('REDIS_URL'):
+            self._redis = aioredis.from_url(os.getenv('REDIS_URL'))
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._semantic_cache = SemanticCache() if os.getenv('CLAWWORK_SEMANTIC_CACHE') == '1' else None
+
+    @property
+    def call_count(self) -> int:
+        """Total completions issued across both id counters (for /health)."""
+        # itertools.count exposes its next value via __reduce__ without
+        # consuming it.
+        compl = self._compl_ids.__reduce__()[1][0] - 1
+        chat = self._chat_ids.__reduce__()[1][0] - 1
+        return compl + chat
 
     def _find_node(self) -> str:
         """Find node executable."""
-        result = subprocess.run(['which', 'node'], capture_output=True, text=True)
-        if result.returncode == 0:
-            return result.stdout.strip()
-        return '/usr/local/bin/node'
+        return shutil.which('node') or '/usr/local/bin/node'
+
+    def _ensure_worker(self) -> subprocess.Popen:
+        """Spawn the resident Node worker, respawning it if it died."""
+        if self._worker is None or self._worker.poll() is not None:
+            cwd = os.path.dirname(os.path.abspath(__file__))
+            self._read_buf = b''
+            self._worker = subprocess.Popen(
+                [self.node_path, _WORKER_JS_PATH],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                cwd=cwd,
+                env=self._child_env
+            )
+        return self._worker
+
+    def _read_response(self, worker: subprocess.Popen, expect_id: int) -> Dict[str, Any]:
+        """
+        Read worker lines until expect_id's response, bounded by the
+        request timeout. Stale lines left over from an earlier interrupted
+        exchange carry older ids and are dropped; on expiry the worker is
+        killed and respawned so the next caller starts from a clean pipe.
+
+        Reads the raw fd with an explicit line buffer (select on a
+        buffered stream would miss lines it has already swallowed).
+        """
+        fd = worker.stdout.fileno()
+        deadline = time.monotonic() + self._request_timeout
+        while True:
+            newline = self._read_buf.find(b'\n')
+            if newline < 0:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0 or not select.select([fd], [], [], timeout)[0]:
+                    worker.kill()
+                    self._worker = None
+                    self._read_buf = b''
+                    return _cli_error(f'CLI wrapper timeout ({int(self._request_timeout)}s)')
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    self._worker = None
+                    self._read_buf = b''
+                    return _cli_error('CLI wrapper worker exited unexpectedly')
+                self._read_buf += chunk
+                continue
+            line = self._read_buf[:newline + 1]
+            self._read_buf = self._read_buf[newline + 1:]
+            try:
+                response = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                return _cli_error(f'Failed to parse response: {line.decode(errors="replace")}')
+            if response.pop('id', None) == expect_id:
+                return response
 
     def _run_cli_wrapper(self, prompt: str, model: str = "claude") -> Dict[str, Any]:
         """
-        Call the Node CLI wrapper with automatic fallback.
-        Tries: claude → gemini → kimi → codex
+        Send one request through the resident Node worker.
+        The worker tries: claude → gemini → kimi → codex
         """
         try:
-            # Build Node code to load and call the wrapper
-            node_code = f"""
-const wrapper = require('./cli-wrapper.js');
-const prompt = {json.dumps(prompt)};
-
-wrapper.callWithFallback(['claude', 'gemini', 'kimi', 'codex'], prompt)
-  .then(result => {{
-    const response = {{
-      ok: result.ok,
-      text: result.text || null,
-      error: result.ok ? null : (result.errors || 'Unknown error'),
-      usage: {{
-        prompt_tokens: Math.ceil(prompt.length / 4),
-        completion_tokens: result.text ? Math.ceil(result.text.length / 4) : 0,
-        total_tokens: Math.ceil((prompt.length + (result.text || '').length) / 4)
-      }}
-    }};
-    console.log(JSON.stringify(response));
-  }})
-  .catch(err => {{
-    console.log(JSON.stringify({{
-      ok: false,
-      text: null,
-      error: err.message,
-      usage: {{
-        prompt_tokens: Math.ceil(prompt.length / 4),
-        completion_tokens: 0,
-        total_tokens: Math.ceil(prompt.length / 4)
-      }}
-    }}));
-  }});
-"""
+            with self._worker_lock:
+                worker = self._ensure_worker()
+                self._request_seq += 1
+                request_id = self._request_seq
+                request = json.dumps({'id': request_id, 'prompt': prompt})
+                worker.stdin.write(request + '\n')
+                worker.stdin.flush()
+                response = self._read_response(worker, request_id)
+            return self._attach_usage(response, prompt)
+
+        except Exception as e:
+            return _cli_error(str(e))
+
+    @staticmethod
+    def _attach_usage(response: Dict[str, Any], prompt: str) -> Dict[str, Any]:
+        """Fill in ~4-chars-per-token usage estimates, computed locally."""
+        if 'usage' not in response:
+            prompt_tokens = -(-len(prompt) // 4)
+            completion_tokens = -(-len(response.get('text') or '') // 4)
+            response['usage'] = {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        return response
+
+    def _cache_key(self,
+                   model: str,
+                   messages: list,
+                   temperature: float,
+                   max_tokens: Optional[int]) -> Optional[str]:
+        """Cache key for a deterministic request, or None when temperature > 0."""
+        if temperature > 0:
+            return None
+        payload = json.dumps({'m': model, 'msgs': messages, 'mt': max_tokens}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
 
-            # Execute via Node in the ClawWork directory
+    def _cache_get(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return the cached response for key, tracking hit/miss counters."""
+        if key is None:
+            return None
+        response = self._cache.get(key)
+        if response is None:
+            self.cache_misses += 1
+            return None
+        self._cache.move_to_end(key)
+        self.cache_hits += 1
+        return response
+
+    def _cache_put(self, key: Optional[str], response: Dict[str, Any]) -> None:
+        """Store a response, evicting the least-recently-used entry if full."""
+        if key is None:
+            return
+        self._cache[key] = response
+        if len(self._cache) > self._cache_max:
+            self._cache.popitem(last=False)
+
+    async def _shared_cache_get(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Look up key in Redis first, falling back to the in-process cache."""
+        if key is not None and self._redis is not None:
+            try:
+                cached = await self._redis.get(key)
+            except Exception as e:
+                logger.debug("redis get failed: %s", e)
+                cached = None
+            if cached is not None:
+                self.cache_hits += 1
+                return orjson.loads(cached)
+        return self._cache_get(key)
+
+    async def _shared_cache_put(self, key: Optional[str], response: Dict[str, Any]) -> None:
+        """Store a response in both the in-process cache and Redis."""
+        self._cache_put(key, response)
+        if key is not None and self._redis is not None:
+            try:
+                await self._redis.set(key, orjson.dumps(response), ex=self._cache_ttl)
+            except Exception as e:
+                logger.debug("redis set failed: %s", e)
+
+    async def _ensure_async_worker(self):
+        """Spawn the asyncio Node worker plus its response reader, respawning on exit."""
+        if self._aworker is None or self._aworker.returncode is not None:
             cwd = os.path.dirname(os.path.abspath(__file__))
-            result = subprocess.run(
-                [self.node_path, '-e', node_code],
-                capture_output=True,
-                text=True,
-                timeout=300,
+            self._aworker = await asyncio.create_subprocess_exec(
+                self.node_path, _WORKER_JS_PATH,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
                 cwd=cwd,
-                env=self._clean_env()
+                env=self._child_env
             )
+            # Fresh inflight dict per worker generation: the old reader's
+            # EOF drain only ever touches its own worker's requests.
+            self._inflight = {}
+            self._reader_task = asyncio.get_running_loop().create_task(
+                self._read_worker(self._aworker, self._inflight)
+            )
+        return self._aworker
+
+    async def _read_worker(self, worker, inflight: Dict[int, asyncio.Future]) -> None:
+        """Route worker response lines to the waiting futures by request id."""
+        while True:
+            line = await worker.stdout.readline()
+            if not line:
+                break
+            try:
+                msg = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                continue
+            fut = inflight.pop(msg.pop('id', None), None)
+            if fut is not None and not fut.done():
+                fut.set_result(msg)
+        # Worker EOF: fail whatever is still waiting on this process.
+        while inflight:
+            _, fut = inflight.popitem()
+            if not fut.done():
+                fut.set_result(_cli_error('CLI wrapper worker exited unexpectedly'))
 
-            if result.returncode == 0:
+    async def _drain_pending(self) -> None:
+        """
+        Coalesce queued requests into batched worker writes.
+        Waits up to _batch_window after the first request (or until
+        _batch_max accumulate) so a burst of N calls ships as one line.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._pending.get()]
+            deadline = loop.time() + self._batch_window
+            while len(batch) < self._batch_max:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
                 try:
-                    response = json.loads(result.stdout.strip())
-                    return response
-                except json.JSONDecodeError:
-                    return {
-                        'ok': False,
-                        'text': None,
-                        'error': f'Failed to parse response: {result.stdout}',
-                        'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
-                    }
-            else:
-                return {
-                    'ok': False,
-                    'text': None,
-                    'error': result.stderr or 'CLI wrapper execution failed',
-                    'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
-                }
+                    batch.append(await asyncio.wait_for(self._pending.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
 
-        except subprocess.TimeoutExpired:
-            return {
-                'ok': False,
-                'text': None,
-                'error': 'CLI wrapper timeout (300s)',
-                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
-            }
-        except Exception as e:
-            return {
-                'ok': False,
-                'text': None,
-                'error': str(e),
-                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
-            }
+            try:
+                # Ensure the worker before registering futures, so they land
+                # in the live generation's inflight dict and can't be failed
+                # by a dead worker's EOF drain.
+                worker = await self._ensure_async_worker()
+                inflight = self._inflight
+                for request_id, _, fut in batch:
+                    inflight[request_id] = fut
+                if len(batch) == 1:
+                    line = orjson.dumps(batch[0][1])
+                else:
+                    line = orjson.dumps({'batch': [payload for _, payload, _ in batch]})
+                worker.stdin.write(line + b'\n')
+                await worker.stdin.drain()
+            except Exception as e:
+                for request_id, _, fut in batch:
+                    self._inflight.pop(request_id, None)
+                    if not fut.done():
+                        fut.set_result(_cli_error(str(e)))
+
+    async def _run_cli_wrapper_async(self, prompt: str, model: str = "claude") -> Dict[str, Any]:
+        """Send one request through the shared async worker, coalescing bursts."""
+        loop = asyncio.get_running_loop()
+        with self._worker_lock:
+            self._request_seq += 1
+            request_id = self._request_seq
+        if self._pending is None:
+            self._pending = asyncio.Queue()
+            self._batcher_task = loop.create_task(self._drain_pending())
+        fut = loop.create_future()
+        await self._pending.put((request_id, {'id': request_id, 'prompt': prompt}, fut))
+        try:
+            response = await asyncio.wait_for(fut, self._request_timeout)
+        except asyncio.TimeoutError:
+            # Abandon just this request; the worker stays up and any late
+            # response line is dropped by the reader.
+            self._inflight.pop(request_id, None)
+            return _cli_error(f'CLI wrapper timeout ({int(self._request_timeout)}s)')
+        return self._attach_usage(response, prompt)
 
     @staticmethod
     def _clean_env() -> Dict[str, str]:
@@ -128,19 +405,24 @@ wrapper.callWithFallback(['claude', 'gemini', 'kimi', 'codex'], prompt)
         Convert OpenAI completion request to CLI wrapper call.
         Returns response in OpenAI API format.
         """
-        self.call_count += 1
+        cli_response = self._run_cli_wrapper(self._format_messages(messages), model)
+        return self._completion_response(cli_response, model)
 
-        # Format messages as prompt
-        prompt = self._format_messages(messages)
-
-        # Call CLI wrapper
-        cli_response = self._run_cli_wrapper(prompt, model)
+    async def create_completion_async(self,
+                                      messages: list,
+                                      model: str = "claude",
+                                      temperature: float = 0.7,
+                                      max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Async variant of create_completion for use inside the event loop."""
+        cli_response = await self._run_cli_wrapper_async(self._format_messages(messages), model)
+        return self._completion_response(cli_response, model)
 
-        # Convert to OpenAI format
+    def _completion_response(self, cli_response: Dict[str, Any], model: str) -> Dict[str, Any]:
+        """Convert a CLI wrapper result to OpenAI completion format."""
         return {
-            'id': f'clawwork-{self.call_count}',
+            'id': f'clawwork-{next(self._compl_ids)}',
             'object': 'text_completion',
-            'created': int(datetime.now().timestamp()),
+            'created': int(time.time()),
             'model': model,
             'choices': [
                 {
@@ -166,19 +448,58 @@ wrapper.callWithFallback(['claude', 'gemini', 'kimi', 'codex'], prompt)
         Convert OpenAI chat completion request to CLI wrapper call.
         Returns response in OpenAI chat format.
         """
-        self.call_count += 1
+        key = self._cache_key(model, messages, temperature, max_tokens)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
 
-        # Format messages as prompt
         prompt = self._format_messages(messages)
+        if key is not None and self._semantic_cache is not None:
+            cached = self._semantic_cache.get(prompt)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
 
-        # Call CLI wrapper
         cli_response = self._run_cli_wrapper(prompt, model)
+        response = self._chat_completion_response(cli_response, model)
+        if cli_response.get('ok'):
+            self._cache_put(key, response)
+            if key is not None and self._semantic_cache is not None:
+                self._semantic_cache.put(prompt, response)
+        return response
 
-        # Convert to OpenAI chat format
+    async def create_chat_completion_async(self,
+                                           messages: list,
+                                           model: str = "claude",
+                                           temperature: float = 0.7,
+                                           max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Async variant of create_chat_completion for use inside the event loop."""
+        key = self._cache_key(model, messages, temperature, max_tokens)
+        cached = await self._shared_cache_get(key)
+        if cached is not None:
+            return cached
+
+        prompt = self._format_messages(messages)
+        if key is not None and self._semantic_cache is not None:
+            cached = self._semantic_cache.get(prompt)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
+
+        cli_response = await self._run_cli_wrapper_async(prompt, model)
+        response = self._chat_completion_response(cli_response, model)
+        if cli_response.get('ok'):
+            await self._shared_cache_put(key, response)
+            if key is not None and self._semantic_cache is not None:
+                self._semantic_cache.put(prompt, response)
+        return response
+
+    def _chat_completion_response(self, cli_response: Dict[str, Any], model: str) -> Dict[str, Any]:
+        """Convert a CLI wrapper result to OpenAI chat completion format."""
         return {
-            'id': f'chatcmpl-{self.call_count}',
+            'id': f'chatcmpl-{next(self._chat_ids)}',
             'object': 'chat.completion',
-            'created': int(datetime.now().timestamp()),
+            'created': int(time.time()),
             'model': model,
             'choices': [
                 {
@@ -197,68 +518,143 @@ wrapper.callWithFallback(['claude', 'gemini', 'kimi', 'codex'], prompt)
             })
         }
 
+    async def stream_chat_completion(self,
+                                     messages: list,
+                                     model: str = "claude",
+                                     temperature: float = 0.7,
+                                     max_tokens: Optional[int] = None):
+        """
+        Yield a chat completion as OpenAI-style SSE frames.
+        The CLI wrapper only hands back complete responses, so the content
+        arrives as one delta; the framing lets clients use stream=True now
+        and pick up true incremental chunks if the wrapper grows them.
+        """
+        response = await self.create_chat_completion_async(messages, model, temperature, max_tokens)
+        choice = response['choices'][0]
+        base = {
+            'id': response['id'],
+            'object': 'chat.completion.chunk',
+            'created': response['created'],
+            'model': model,
+        }
+        content_chunk = dict(base, choices=[{
+            'index': 0,
+            'delta': {'role': 'assistant', 'content': choice['message']['content']},
+            'finish_reason': None,
+        }])
+        yield b'data: ' + orjson.dumps(content_chunk) + b'\n\n'
+        done_chunk = dict(base, choices=[{
+            'index': 0,
+            'delta': {},
+            'finish_reason': choice['finish_reason'],
+        }])
+        yield b'data: ' + orjson.dumps(done_chunk) + b'\n\n'
+        yield b'data: [DONE]\n\n'
+
     @staticmethod
     def _format_messages(messages: list) -> str:
-        """Convert message list to prompt string."""
-        lines = []
+        """Convert message list to prompt string.
+
+        Content may be a plain string or an Anthropic-style list of text
+        blocks (e.g. cache-marked system prompts); block lists flatten to
+        their text rather than repr'ing into the prompt.
+        """
+        parts = []
         for msg in messages:
-            role = msg.get('role', 'user').upper()
             content = msg.get('content', '')
-            lines.append(f"{role}:\n{content}\n")
-        return "\n".join(lines)
+            if isinstance(content, list):
+                content = ''.join(block.get('text', '') for block in content)
+            parts.append(f"{(msg.get('role') or 'user').upper()}:\n{content}\n")
+        return "\n".join(parts)
 
 
-# FastAPI server for OpenAI API compatibility
-if __name__ == '__main__':
-    from fastapi import FastAPI, HTTPException
-    from fastapi.responses import JSONResponse
-    import uvicorn
+# FastAPI server for OpenAI API compatibility. Lives at module scope so
+# uvicorn workers can import cli_wrapper_proxy:app; note the in-process
+# caches are then per-worker.
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
-    app = FastAPI(title="ClawWork CLI Wrapper Proxy")
-    proxy = CLIWrapperProxy()
+app = FastAPI(title="ClawWork CLI Wrapper Proxy", default_response_class=ORJSONResponse)
+proxy = CLIWrapperProxy()
 
-    @app.post("/v1/completions")
-    async def completions(request: dict):
-        """OpenAI completions endpoint"""
-        try:
-            print(f"[PROXY] POST /v1/completions: {request}")
-            response = proxy.create_completion(
-                messages=request.get('prompt', []),
-                model=request.get('model', 'claude'),
-                temperature=request.get('temperature', 0.7),
-                max_tokens=request.get('max_tokens')
-            )
-            print(f"[PROXY] Response: {response}")
-            return response
-        except Exception as e:
-            print(f"[PROXY] Error: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            raise HTTPException(status_code=500, detail=str(e))
-
-    @app.post("/v1/chat/completions")
-    async def chat_completions(request: dict):
-        """OpenAI chat completions endpoint"""
-        try:
-            print(f"[PROXY] POST /v1/chat/completions: {request}")
-            response = proxy.create_chat_completion(
-                messages=request.get('messages', []),
-                model=request.get('model', 'claude'),
-                temperature=request.get('temperature', 0.7),
-                max_tokens=request.get('max_tokens')
+
+@app.on_event("startup")
+async def _setup_logging():
+    """
+    Non-blocking log emission: handlers write from a listener thread so
+    request coroutines never wait on a stdout flush. Runs once per worker.
+    """
+    import logging.handlers
+    import queue
+
+    if logger.handlers:
+        return
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(levelname)s %(message)s'))
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+
+
+@app.post("/v1/completions")
+async def completions(request: dict):
+    """OpenAI completions endpoint"""
+    try:
+        logger.debug("POST /v1/completions: %s", request)
+        response = await proxy.create_completion_async(
+            messages=request.get('prompt', []),
+            model=request.get('model', 'claude'),
+            temperature=request.get('temperature', 0.7),
+            max_tokens=request.get('max_tokens')
+        )
+        logger.debug("response: %s", response)
+        return response
+    except Exception as e:
+        logger.exception("completions failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: dict):
+    """OpenAI chat completions endpoint"""
+    try:
+        logger.debug("POST /v1/chat/completions: %s", request)
+        if request.get('stream'):
+            return StreamingResponse(
+                proxy.stream_chat_completion(
+                    messages=request.get('messages', []),
+                    model=request.get('model', 'claude'),
+                    temperature=request.get('temperature', 0.7),
+                    max_tokens=request.get('max_tokens')
+                ),
+                media_type='text/event-stream'
             )
-            print(f"[PROXY] Response OK: {response['id']}")
-            return response
-        except Exception as e:
-            print(f"[PROXY] Error: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            raise HTTPException(status_code=500, detail=str(e))
+        response = await proxy.create_chat_completion_async(
+            messages=request.get('messages', []),
+            model=request.get('model', 'claude'),
+            temperature=request.get('temperature', 0.7),
+            max_tokens=request.get('max_tokens')
+        )
+        logger.info("ok id=%s", response['id'])
+        return response
+    except Exception as e:
+        logger.exception("chat completions failed")
+        raise HTTPException(status_code=500, detail=str(e))
 
-    @app.get("/health")
-    async def health():
-        """Health check endpoint"""
-        return {"status": "healthy", "calls": proxy.call_count}
+@app.get("/health")
+async def health():
+    """Health check endpoint"""
+    return {
+        "status": "healthy",
+        "calls": proxy.call_count,
+        "cache_hits": proxy.cache_hits,
+        "cache_misses": proxy.cache_misses,
+    }
+
+
+if __name__ == '__main__':
+    import uvicorn
 
     print(f"🦞 ClawWork CLI Wrapper Proxy starting...")
     print(f"   API endpoint: http://localhost:8001")
@@ -266,4 +662,11 @@ if __name__ == '__main__':
     print(f"   Health check: GET /health")
     print(f"")
 
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    uvicorn.run(
+        "cli_wrapper_proxy:app",
+        host="0.0.0.0",
+        port=8001,
+        workers=int(os.getenv('WORKERS', '4')),
+        loop='uvloop',
+        http='httptools',
+    )
@@ -4,54 +4,224 @@ Realtor AI MVP - Production Version
 Uses Claude API directly (no CLI wrapper dependency)
 """
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
+import asyncio
+import hashlib
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+from cachetools import TTLCache
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.staticfiles import StaticFiles
 import httpx
 import json
 import os
-import subprocess
+import random
+
+from pydantic import BaseModel, ConfigDict
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# CLI wrapper proxy endpoint (OpenAI chat format)
+CLI_WRAPPER_URL = os.getenv("CLI_WRAPPER_URL", "http://localhost:8001/v1/chat/completions")
+
+# With an API key set, requests go straight to the Anthropic Messages API
+# over the pooled client — no wrapper hop, no process fork on the hot path.
+ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
+ANTHROPIC_URL = "https://api.anthropic.com/v1/messages"
+ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL", "claude-3-5-sonnet-latest")
 
-app = FastAPI(title="Realtor AI MVP")
+# Prompts over this bounce with a 400 before any network round trip;
+# counting requires tiktoken (optional) and is skipped without it.
+MAX_INPUT_TOKENS = int(os.getenv("MAX_INPUT_TOKENS", 8192))
 
-# CORS setup
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+# Rendered site root: the built index.html lands here so the "/" mount can
+# serve it straight off the filesystem (sendfile path, no per-view coroutine).
+SITE_DIR = os.path.join(STATIC_DIR, "_site")
+
+def _minify_asset(name: str, minifier) -> str:
+    """Minify one static asset to name.min.ext, returning its content hash
+
+    Written via temp file + os.replace: every worker rebuilds at startup,
+    and the atomic swap keeps siblings from serving a half-written file.
+    """
+    base, ext = os.path.splitext(name)
+    with open(os.path.join(STATIC_DIR, name)) as f:
+        source = f.read()
+    minified = minifier(source) if minifier else source
+    dest = os.path.join(STATIC_DIR, f"{base}.min{ext}")
+    tmp = f"{dest}.tmp.{os.getpid()}"
+    with open(tmp, "w") as f:
+        f.write(minified)
+    os.replace(tmp, dest)
+    return hashlib.blake2b(minified.encode(), digest_size=8).hexdigest()
+
+@lru_cache(maxsize=1)
+def _build_static() -> bytes:
+    """Minify CSS/JS and render index.html with cache-busting asset URLs
+
+    rcssmin/rjsmin are optional; without them the assets are copied as-is.
+    Cached as pre-encoded bytes so GET / never rebuilds or re-encodes.
+    """
+    try:
+        from rcssmin import cssmin
+    except ImportError:
+        cssmin = None
+    try:
+        from rjsmin import jsmin
+    except ImportError:
+        jsmin = None
+    try:
+        from htmlmin import minify as htmlminify
+    except ImportError:
+        htmlminify = None
+    css_v = _minify_asset("app.css", cssmin)
+    js_v = _minify_asset("app.js", jsmin)
+    with open(os.path.join(STATIC_DIR, "index.html")) as f:
+        html = f.read()
+    html = html.replace("__CSS_V__", css_v).replace("__JS_V__", js_v)
+    if htmlminify is not None:
+        html = htmlminify(html, remove_empty_space=True, remove_comments=True)
+    built = html.encode("utf-8")
+    os.makedirs(SITE_DIR, exist_ok=True)
+    dest = os.path.join(SITE_DIR, "index.html")
+    tmp = f"{dest}.tmp.{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(built)
+    os.replace(tmp, dest)  # atomic, same as the minified assets
+    return built
+
+@asynccontextmanager
+async def lifespan(app):
+    """Build the shared HTTP client once per process and close it on shutdown"""
+    # Pool sized for burst fan-out (HTTPX_MAX_CONN/HTTPX_KEEPALIVE tune it
+    # per deployment); HTTP/2 multiplexes concurrent generations onto a
+    # handful of connections so handshakes are amortized away.
+    app.state.http = httpx.AsyncClient(
+        timeout=httpx.Timeout(connect=10.0, read=60.0, write=10.0, pool=5.0),
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("HTTPX_MAX_CONN", 512)),
+            max_keepalive_connections=int(os.getenv("HTTPX_KEEPALIVE", 256)),
+            keepalive_expiry=30.0,
+        ),
+        http2=True,
+    )
+    _build_static()  # warm the cache before the first request
+    app.state.claude_lock = asyncio.Lock()
+    try:
+        app.state.claude = await _spawn_claude_repl()
+    except OSError:
+        app.state.claude = None  # respawned lazily if a fallback call needs it
+    batcher.start()
+    yield
+    batcher.stop()
+    if app.state.claude is not None and app.state.claude.returncode is None:
+        app.state.claude.terminate()
+    await app.state.http.aclose()
+
+app = FastAPI(title="Realtor AI MVP", lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Compress HTML/JSON bodies over ~500 bytes. Brotli gets better text
+# ratios and its middleware falls back to gzip for older clients;
+# brotli-asgi is optional, so plain gzip remains the default.
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, quality=4, minimum_size=500)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=500)
+
+# CORS setup: a concrete method/header list plus max_age lets browsers
+# cache the preflight for a day instead of re-issuing OPTIONS per POST.
+# Credentials only go with a concrete origin — wildcard + credentials is
+# spec-invalid and pushes Starlette onto its per-request Origin-echo path.
+_FRONTEND_ORIGIN = os.getenv("FRONTEND_ORIGIN", "*")
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=[_FRONTEND_ORIGIN],
+    allow_credentials=_FRONTEND_ORIGIN != "*",
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type"],
+    max_age=86400,
 )
 
-async def call_claude(prompt: str) -> str:
-    """Call Claude via subprocess (claude CLI)"""
-    try:
-        result = subprocess.run(
-            ["claude", "message", prompt],
-            capture_output=True,
-            text=True,
-            timeout=60,
-            env={**os.environ}
-        )
-        if result.returncode == 0 and result.stdout.strip():
-            return result.stdout.strip()
-    except Exception as e:
-        print(f"Claude CLI error: {e}")
-        raise
+@app.exception_handler(HTTPException)
+async def _http_exception_orjson(request: Request, exc: HTTPException):
+    """Serialize error bodies with orjson too, not just success responses"""
+    return ORJSONResponse(
+        {"detail": exc.detail}, status_code=exc.status_code, headers=exc.headers,
+    )
 
-async def generate_description(listing_data: dict) -> str:
-    """Generate MLS listing description"""
-    prompt = f"""You are a professional real estate copywriter. Write a compelling MLS listing description.
-
-Property Details:
-- Address: {listing_data.get('address', 'N/A')}
-- Bedrooms: {listing_data.get('bedrooms', 'N/A')}
-- Bathrooms: {listing_data.get('bathrooms', 'N/A')}
-- Square Feet: {listing_data.get('sqft', 'N/A')}
-- Price: ${listing_data.get('price', 'N/A'):,.0f}
-- Year Built: {listing_data.get('year_built', 'N/A')}
-- Features: {listing_data.get('features', 'N/A')}
-- Neighborhood: {listing_data.get('neighborhood', 'N/A')}
+class ListingIn(BaseModel):
+    """Listing payload for description generation; unknown fields are ignored"""
+    model_config = ConfigDict(extra="ignore")
+
+    address: str = "N/A"
+    bedrooms: int | None = None
+    bathrooms: float | None = None
+    sqft: int | None = None
+    price: float | None = None
+    year_built: int | None = None
+    features: list[str] = []
+    neighborhood: str = "N/A"
+
+class ComparableIn(BaseModel):
+    """One comparable sale for CMA generation"""
+    model_config = ConfigDict(extra="ignore")
+
+    address: str = "N/A"
+    price: float = 0
+    sqft: int = 0
+    beds: int = 0
+    baths: float = 0
+
+class CMAIn(BaseModel):
+    """CMA payload: pre-formatted text from the dashboard, or structured rows"""
+    model_config = ConfigDict(extra="ignore")
+
+    comparables_text: str | None = None
+    comparable_sales: list[ComparableIn] = []
+
+class BuyerProfileIn(BaseModel):
+    """Buyer profile for follow-up email generation"""
+    model_config = ConfigDict(extra="ignore")
+
+    interests: str | list[str] = "N/A"
+    budget: float | None = None
+    timeline: str = "N/A"
+    previous_inquiries: str | list[str] = "N/A"
+
+class EmailIn(BaseModel):
+    """Follow-up email payload"""
+    model_config = ConfigDict(extra="ignore")
+
+    agent_name: str = "Agent"
+    buyer_profile: BuyerProfileIn = BuyerProfileIn()
+
+class GenerateAllIn(BaseModel):
+    """Combined payload for the one-round-trip generate-all endpoint"""
+    model_config = ConfigDict(extra="ignore")
+
+    listing: ListingIn = ListingIn()
+    comparable_sales: list[ComparableIn] = []
+    comparables: list[ComparableIn] = []  # accepted alias
+    agent_name: str = "Agent"
+    buyer_profile: BuyerProfileIn = BuyerProfileIn()
+
+# Static instruction blocks, hoisted so they are built once and marked
+# cacheable so Claude can reuse the processed prefix across calls.
+STATIC_COPYWRITER_PROMPT = """You are a professional real estate copywriter. Write a compelling MLS listing description.
 
 Write a captivating 3-4 paragraph listing description that:
 1. Opens with an engaging hook
@@ -61,22 +231,7 @@ Write a captivating 3-4 paragraph listing description that:
 
 Make it persuasive, professional, and perfect for MLS."""
 
-    try:
-        return await call_claude(prompt)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to generate description: {str(e)}")
-
-async def generate_cma(comparable_sales: list) -> str:
-    """Generate Comparative Market Analysis"""
-    comparables_text = "\n".join([
-        f"- {comp['address']}: ${comp['price']:,.0f} ({comp['sqft']} sqft, {comp['beds']} bed, {comp['baths']} bath)"
-        for comp in comparable_sales
-    ])
-
-    prompt = f"""You are a professional real estate appraiser. Analyze these comparable sales and provide a market analysis report.
-
-COMPARABLE SALES:
-{comparables_text}
+STATIC_CMA_PROMPT = """You are a professional real estate appraiser. Analyze these comparable sales and provide a market analysis report.
 
 Provide a brief CMA report that includes:
 1. Average Price Per Square Foot
@@ -87,21 +242,7 @@ Provide a brief CMA report that includes:
 
 Make it professional and suitable for MLS presentation."""
 
-    try:
-        return await call_claude(prompt)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to generate CMA: {str(e)}")
-
-async def generate_followup_email(agent_name: str, buyer_profile: dict) -> str:
-    """Generate personalized follow-up email"""
-    prompt = f"""You are a professional real estate agent. Write a personalized follow-up email.
-
-Agent Name: {agent_name}
-Buyer Profile:
-- Interests: {buyer_profile.get('interests', 'N/A')}
-- Budget: ${buyer_profile.get('budget', 'N/A'):,.0f}
-- Timeline: {buyer_profile.get('timeline', 'N/A')}
-- Previous Inquiries: {buyer_profile.get('previous_inquiries', 'N/A')}
+STATIC_EMAIL_PROMPT = """You are a professional real estate agent. Write a personalized follow-up email.
 
 Write a warm, personalized follow-up email that:
 1. References previous interaction
@@ -112,347 +253,536 @@ Write a warm, personalized follow-up email that:
 
 Make it compelling and personal."""
 
+# Dynamic-block templates, parsed once at import; builders fill them with
+# format_map so missing fields default to N/A instead of raising.
+DESCRIPTION_TEMPLATE = """Property Details:
+- Address: {address}
+- Bedrooms: {bedrooms}
+- Bathrooms: {bathrooms}
+- Square Feet: {sqft}
+- Price: {price_str}
+- Year Built: {year_built}
+- Features: {features}
+- Neighborhood: {neighborhood}"""
+_DESC_FILL = DESCRIPTION_TEMPLATE.format_map  # bound once, like _CMA_ROW
+
+CMA_COMP_TEMPLATE = "- {address}: ${price:,.0f} ({sqft} sqft, {beds} bed, {baths} bath)"
+_CMA_ROW = CMA_COMP_TEMPLATE.format_map  # bound once; row formatting is a single call
+
+EMAIL_TEMPLATE = """Agent Name: {agent_name}
+Buyer Profile:
+- Interests: {interests}
+- Budget: {budget_str}
+- Timeline: {timeline}
+- Previous Inquiries: {previous_inquiries}"""
+_EMAIL_FILL = EMAIL_TEMPLATE.format_map
+
+# Bound once at import: each call is a direct method call instead of
+# rebuilding an f-string through the generic formatter dispatch.
+_FMT_PRICE = "${:,.0f}".format
+
+def _safe_price(value) -> str:
+    """Format a price as $X,XXX, tolerating missing or non-numeric values"""
+    return _FMT_PRICE(value) if isinstance(value, (int, float)) else "N/A"
+
+def _system_block(text: str) -> dict:
+    """Wrap a static instruction block with an Anthropic cache marker"""
+    return {
+        "role": "system",
+        "content": [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}],
+    }
+
+def _messages_to_text(messages: list) -> str:
+    """Flatten chat messages to plain text for the CLI fallback"""
+    parts = []
+    for msg in messages:
+        content = msg.get("content", "")
+        if isinstance(content, list):
+            content = "".join(block.get("text", "") for block in content)
+        parts.append(content)
+    return "\n\n".join(parts)
+
+async def _spawn_claude_repl():
+    """Start the long-lived claude REPL used by the CLI fallback path"""
+    return await asyncio.create_subprocess_exec(
+        "claude", "repl", "--json",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+
+async def _call_claude_repl(messages) -> str:
+    """Round-trip one prompt through the resident claude REPL
+
+    A write+readline against a warm process instead of a fork and cold
+    start per fallback call; the lock serializes use of the pipe.
+    """
+    async with app.state.claude_lock:
+        proc = app.state.claude
+        if proc is None or proc.returncode is not None:
+            proc = await _spawn_claude_repl()
+            app.state.claude = proc
+        try:
+            proc.stdin.write(json.dumps({"prompt": _messages_to_text(messages)}).encode() + b"\n")
+            await proc.stdin.drain()
+            line = await asyncio.wait_for(proc.stdout.readline(), timeout=60)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # An abandoned round trip (hedge loser cancelled, or timeout)
+            # leaves the response line buffered in the pipe, where the next
+            # caller's readline would consume it as its own answer. Kill
+            # the process so the next call starts from a clean pipe.
+            proc.kill()
+            app.state.claude = None
+            raise
+    return json.loads(line)["text"]
+
+_HEDGE_DELAY = 2.0  # give the cheap HTTP path a head start before hedging
+_RETRY_ATTEMPTS = 5
+
+# Caps concurrent outbound Claude calls so burst load degrades into
+# queueing instead of upstream rate-limit errors.
+CLAUDE_SEM = asyncio.Semaphore(int(os.getenv("CLAUDE_MAX_INFLIGHT", 64)))
+
+async def _post_with_retry(url, payload, headers=None) -> httpx.Response:
+    """POST with jittered exponential backoff on 429/5xx
+
+    Honors Retry-After when the upstream sends one, so transient
+    trouble becomes added latency instead of a 500 to the client.
+    """
+    for attempt in range(_RETRY_ATTEMPTS):
+        response = await app.state.http.post(url, json=payload, headers=headers)
+        if response.status_code != 429 and response.status_code < 500:
+            break
+        if attempt == _RETRY_ATTEMPTS - 1:
+            break
+        try:
+            delay = float(response.headers["retry-after"])
+        except (KeyError, ValueError):
+            delay = min(30.0, 2 ** attempt + random.random())
+        await asyncio.sleep(delay)
+    response.raise_for_status()
+    return response
+
+def _split_system(messages) -> tuple:
+    """Split chat messages into Anthropic-style (system blocks, turns)"""
+    system, chat = [], []
+    for msg in messages:
+        if msg.get("role") == "system":
+            content = msg["content"]
+            system.extend(content if isinstance(content, list) else [{"type": "text", "text": content}])
+        else:
+            chat.append(msg)
+    return system, chat
+
+def _anthropic_headers() -> dict:
+    return {
+        "x-api-key": ANTHROPIC_API_KEY,
+        "anthropic-version": "2023-06-01",
+        # The cache_control markers on system blocks need this opt-in
+        "anthropic-beta": "prompt-caching-2024-07-31",
+    }
+
+async def _anthropic_request(messages) -> str:
+    """One attempt against the Anthropic Messages API"""
+    system, chat = _split_system(messages)
+    payload = {"model": ANTHROPIC_MODEL, "max_tokens": 1024, "messages": chat}
+    if system:
+        payload["system"] = system
+    response = await _post_with_retry(ANTHROPIC_URL, payload, headers=_anthropic_headers())
+    return response.json()["content"][0]["text"]
+
+async def _wrapper_request(messages) -> str:
+    """One attempt against the CLI wrapper proxy"""
+    response = await _post_with_retry(CLI_WRAPPER_URL, {"model": "claude", "messages": messages})
+    return response.json()["choices"][0]["message"]["content"]
+
+async def _hedged_repl(messages) -> str:
+    """REPL leg of the hedge; only does work if the HTTP leg is still pending"""
+    await asyncio.sleep(_HEDGE_DELAY)
+    return await _call_claude_repl(messages)
+
+async def _call_claude_direct(prompt) -> str:
+    """Call Claude, racing the HTTP path against the resident REPL
+
+    The HTTP leg — the Anthropic API when ANTHROPIC_API_KEY is set,
+    the CLI wrapper proxy otherwise — starts immediately and the REPL
+    leg after a short stagger, so the REPL only runs when the HTTP path
+    is slow or down. First success wins and the loser is cancelled —
+    one path's failure no longer adds its full timeout to the other's
+    latency. With neither an API key nor CLI_WRAPPER_URL configured,
+    the REPL is primary.
+    """
+    messages = [{"role": "user", "content": prompt}] if isinstance(prompt, str) else prompt
+    if ANTHROPIC_API_KEY:
+        http_leg = _anthropic_request(messages)
+    elif CLI_WRAPPER_URL:
+        http_leg = _wrapper_request(messages)
+    else:
+        return await _call_claude_repl(messages)
+
+    tasks = {
+        asyncio.create_task(http_leg),
+        asyncio.create_task(_hedged_repl(messages)),
+    }
+    try:
+        failure = None
+        while tasks:
+            done, tasks = await asyncio.wait(
+                tasks, return_when=asyncio.FIRST_COMPLETED, timeout=60,
+            )
+            if not done:
+                raise TimeoutError("Claude call timed out")
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                failure = task.exception()
+                print(f"Claude backend error: {failure}")
+        raise failure
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def _anthropic_stream(messages):
+    """Yield text deltas from the Anthropic Messages API streaming endpoint"""
+    system, chat = _split_system(messages)
+    payload = {"model": ANTHROPIC_MODEL, "max_tokens": 1024, "messages": chat, "stream": True}
+    if system:
+        payload["system"] = system
+    async with app.state.http.stream(
+        "POST", ANTHROPIC_URL, json=payload, headers=_anthropic_headers(),
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            event = json.loads(line[6:])
+            if event.get("type") == "content_block_delta":
+                text = event["delta"].get("text")
+                if text:
+                    yield text
+
+async def _wrapper_stream(messages):
+    """Yield text deltas from the CLI wrapper proxy's OpenAI-style SSE"""
+    async with app.state.http.stream(
+        "POST",
+        CLI_WRAPPER_URL,
+        json={"model": "claude", "messages": messages, "stream": True},
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            data = line[6:]
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            delta = chunk["choices"][0].get("delta", {}).get("content")
+            if delta:
+                yield delta
+
+async def call_claude_stream(prompt):
+    """Relay Claude's response as SSE frames while the backend streams it
+
+    Yields ``data: {"text": ...}`` frames as content deltas arrive, so the
+    browser can render from roughly first-token latency instead of waiting
+    out the whole completion, then a final ``data: [DONE]``. Streams from
+    the Anthropic API directly when a key is set, else via the wrapper.
+    """
+    messages = [{"role": "user", "content": prompt}] if isinstance(prompt, str) else prompt
+    source = _anthropic_stream(messages) if ANTHROPIC_API_KEY else _wrapper_stream(messages)
+    async for text in source:
+        yield f"data: {json.dumps({'text': text})}\n\n"
+    yield "data: [DONE]\n\n"
+
+class PromptBatcher:
+    """
+    Micro-batches concurrent Claude calls: prompts queue up for ~25 ms
+    (or until batch_size accumulate) and then fly together via
+    asyncio.gather over the pooled client, amortizing per-request
+    dispatch overhead under burst load.
+    """
+
+    def __init__(self, window: float = 0.025, batch_size: int = 32):
+        self.window = window
+        self.batch_size = batch_size
+        self._pending = []
+        self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the background drain loop (called from the lifespan)"""
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self._drain())
+
+    def stop(self):
+        """Cancel the drain loop on shutdown"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def submit(self, prompt) -> str:
+        """Queue one prompt; resolves with its completion"""
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append((prompt, fut))
+        return await fut
+
+    async def _drain(self):
+        while True:
+            await asyncio.sleep(self.window)
+            while self._pending:
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+                asyncio.get_running_loop().create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        results = await asyncio.gather(
+            *(_call_claude_direct(prompt) for prompt, _ in batch),
+            return_exceptions=True,
+        )
+        for (_, fut), result in zip(batch, results):
+            if fut.done():
+                continue
+            if isinstance(result, Exception):
+                fut.set_exception(result)
+            else:
+                fut.set_result(result)
+
+batcher = PromptBatcher()
+
+# Replayed prompts (demo refreshes, identical form resubmits) resolve from
+# here instead of paying another Claude round trip.
+RESPONSE_CACHE = TTLCache(maxsize=2048, ttl=600)
+_cache_lock = asyncio.Lock()
+
+def _canonical(value):
+    """Normalize numbers recursively so 500000 and 500000.0 key identically"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, dict):
+        return {k: _canonical(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_canonical(v) for v in value]
+    return value
+
+def _prompt_key(prompt) -> bytes:
+    """Stable cache key for a prompt string or messages list"""
+    if isinstance(prompt, str):
+        canonical = prompt
+    else:
+        canonical = json.dumps(_canonical(prompt), sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode(), digest_size=16).digest()
+
+# Singleflight: duplicate prompts submitted while the first is still in
+# flight (retries, double-clicks) await the same task instead of each
+# paying their own LLM call — the TTL cache only covers completed calls.
+INFLIGHT: dict = {}
+
+async def _call_and_store(prompt, key: bytes) -> str:
+    async with CLAUDE_SEM:
+        if batcher.running:
+            result = await batcher.submit(prompt)
+        else:
+            result = await _call_claude_direct(prompt)
+    if result:
+        async with _cache_lock:
+            RESPONSE_CACHE[key] = result
+    return result
+
+@lru_cache(maxsize=1)
+def _encoder():
+    return tiktoken.get_encoding("cl100k_base")
+
+def _count_tokens(prompt) -> int | None:
+    """Approximate prompt token count; None when tiktoken is unavailable"""
+    if tiktoken is None:
+        return None
+    text = prompt if isinstance(prompt, str) else _messages_to_text(prompt)
+    return len(_encoder().encode(text))
+
+async def call_claude(prompt) -> str:
+    """Call Claude through the micro-batcher when it is running,
+    degrading to a direct call otherwise (e.g. outside the server).
+    Identical prompts within the cache TTL replay the stored response;
+    identical prompts already in flight share one upstream call.
+    Oversize prompts fail fast instead of burning an upstream round trip."""
+    tokens = _count_tokens(prompt)
+    if tokens is not None and tokens > MAX_INPUT_TOKENS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Prompt too large: {tokens} tokens (limit {MAX_INPUT_TOKENS})",
+        )
+
+    key = _prompt_key(prompt)
+    async with _cache_lock:
+        cached = RESPONSE_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    task = INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.get_running_loop().create_task(_call_and_store(prompt, key))
+        INFLIGHT[key] = task
+        task.add_done_callback(lambda _: INFLIGHT.pop(key, None))
+    return await task
+
+async def call_claude_batch(prompts: list) -> list:
+    """Run several Claude prompts concurrently over the shared client"""
+    return await asyncio.gather(*(call_claude(p) for p in prompts), return_exceptions=True)
+
+def _build_description_messages(listing_data: dict) -> list:
+    """Build the MLS listing description messages (cacheable system + dynamic user)"""
+    fields = defaultdict(lambda: "N/A", listing_data)
+    fields["price_str"] = _safe_price(listing_data.get("price"))
+    details = _DESC_FILL(fields)
+    return [_system_block(STATIC_COPYWRITER_PROMPT), {"role": "user", "content": details}]
+
+async def generate_description(listing_data: dict) -> str:
+    """Generate MLS listing description"""
     try:
-        return await call_claude(prompt)
+        return await call_claude(_build_description_messages(listing_data))
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to generate email: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate description: {str(e)}")
 
-@app.get("/", response_class=HTMLResponse)
-async def index():
-    """Serve the main dashboard"""
-    return """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Realtor AI - MLS Generator</title>
-        <style>
-            * { margin: 0; padding: 0; box-sizing: border-box; }
-            body {
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                min-height: 100vh;
-                padding: 20px;
-            }
-            .container {
-                max-width: 1200px;
-                margin: 0 auto;
-                display: grid;
-                grid-template-columns: 1fr 1fr;
-                gap: 20px;
-            }
-            h1 {
-                grid-column: 1 / -1;
-                color: white;
-                margin-bottom: 20px;
-                font-size: 2.5em;
-            }
-            .card {
-                background: white;
-                border-radius: 12px;
-                padding: 25px;
-                box-shadow: 0 10px 40px rgba(0,0,0,0.2);
-            }
-            .card h2 {
-                color: #333;
-                margin-bottom: 15px;
-                font-size: 1.4em;
-            }
-            .form-group {
-                margin-bottom: 12px;
-            }
-            label {
-                display: block;
-                margin-bottom: 5px;
-                color: #555;
-                font-weight: 500;
-            }
-            input, textarea, select {
-                width: 100%;
-                padding: 10px;
-                border: 1px solid #ddd;
-                border-radius: 6px;
-                font-size: 14px;
-                font-family: inherit;
-            }
-            textarea {
-                resize: vertical;
-                min-height: 80px;
-            }
-            button {
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 12px 20px;
-                border: none;
-                border-radius: 6px;
-                cursor: pointer;
-                font-size: 14px;
-                font-weight: 600;
-                width: 100%;
-                margin-top: 10px;
-            }
-            button:hover {
-                opacity: 0.9;
-            }
-            .output {
-                background: #f5f5f5;
-                padding: 15px;
-                border-radius: 6px;
-                margin-top: 15px;
-                max-height: 300px;
-                overflow-y: auto;
-                white-space: pre-wrap;
-                word-break: break-word;
-                font-size: 13px;
-                line-height: 1.5;
-                display: none;
-            }
-            .output.active {
-                display: block;
-            }
-            .loading {
-                display: none;
-                color: #667eea;
-                font-size: 14px;
-            }
-            .loading.active {
-                display: block;
-            }
-            .error {
-                background: #fee;
-                color: #c33;
-                padding: 10px;
-                border-radius: 4px;
-                margin-top: 10px;
-                display: none;
-            }
-            .error.active {
-                display: block;
-            }
-            @media (max-width: 768px) {
-                .container { grid-template-columns: 1fr; }
-                h1 { font-size: 1.8em; }
-            }
-        </style>
-    </head>
-    <body>
-        <h1>🏠 Realtor AI MVP</h1>
-
-        <div class="container">
-            <div class="card">
-                <h2>📝 MLS Description Generator</h2>
-                <form onsubmit="generateDescription(event)">
-                    <div class="form-group">
-                        <label>Address</label>
-                        <input type="text" id="desc_address" placeholder="123 Main St, City, State" required>
-                    </div>
-                    <div class="form-group">
-                        <label>Bedrooms</label>
-                        <input type="number" id="desc_bedrooms" placeholder="3" required>
-                    </div>
-                    <div class="form-group">
-                        <label>Bathrooms</label>
-                        <input type="number" id="desc_bathrooms" placeholder="2" step="0.5" required>
-                    </div>
-                    <div class="form-group">
-                        <label>Square Feet</label>
-                        <input type="number" id="desc_sqft" placeholder="2400" required>
-                    </div>
-                    <div class="form-group">
-                        <label>Price</label>
-                        <input type="number" id="desc_price" placeholder="500000" required>
-                    </div>
-                    <div class="form-group">
-                        <label>Year Built</label>
-                        <input type="number" id="desc_year_built" placeholder="2020" required>
-                    </div>
-                    <div class="form-group">
-                        <label>Features (comma separated)</label>
-                        <textarea id="desc_features" placeholder="Updated kitchen, hardwood floors, garden"></textarea>
-                    </div>
-                    <div class="form-group">
-                        <label>Neighborhood</label>
-                        <input type="text" id="desc_neighborhood" placeholder="Downtown, Suburbs, etc." required>
-                    </div>
-                    <button type="submit">Generate Description</button>
-                    <div class="loading" id="desc_loading">Generating...</div>
-                    <div class="error" id="desc_error"></div>
-                    <div class="output" id="desc_output"></div>
-                </form>
-            </div>
-
-            <div class="card">
-                <h2>📊 CMA Report Generator</h2>
-                <form onsubmit="generateCMA(event)">
-                    <div class="form-group">
-                        <label>Comparables (JSON format)</label>
-                        <textarea id="cma_comparables" placeholder='[{"address":"456 Pine St","price":1300000,"sqft":2500,"beds":3,"baths":2}]' required>[{"address":"456 Pine St","price":1300000,"sqft":2500,"beds":3,"baths":2}]</textarea>
-                    </div>
-                    <button type="submit">Generate CMA</button>
-                    <div class="loading" id="cma_loading">Generating...</div>
-                    <div class="error" id="cma_error"></div>
-                    <div class="output" id="cma_output"></div>
-                </form>
-            </div>
-
-            <div class="card">
-                <h2>💌 Follow-up Email Generator</h2>
-                <form onsubmit="generateEmail(event)">
-                    <div class="form-group">
-                        <label>Agent Name</label>
-                        <input type="text" id="email_agent_name" placeholder="Your Name" required>
-                    </div>
-                    <div class="form-group">
-                        <label>Buyer Profile (JSON)</label>
-                        <textarea id="email_buyer_profile" placeholder='{"interests":["Modern homes"],"budget":500000,"timeline":"3 months","previous_inquiries":"Viewed 3 properties"}' required>{"interests":["Modern homes"],"budget":500000,"timeline":"3 months","previous_inquiries":"Viewed 3 properties"}</textarea>
-                    </div>
-                    <button type="submit">Generate Email</button>
-                    <div class="loading" id="email_loading">Generating...</div>
-                    <div class="error" id="email_error"></div>
-                    <div class="output" id="email_output"></div>
-                </form>
-            </div>
-        </div>
-
-        <script>
-            async function generateDescription(e) {
-                e.preventDefault();
-                const output = document.getElementById('desc_output');
-                const loading = document.getElementById('desc_loading');
-                const error = document.getElementById('desc_error');
-
-                loading.classList.add('active');
-                error.classList.remove('active');
-                output.classList.remove('active');
-
-                try {
-                    const response = await fetch('/api/generate-description', {
-                        method: 'POST',
-                        headers: {'Content-Type': 'application/json'},
-                        body: JSON.stringify({
-                            address: document.getElementById('desc_address').value,
-                            bedrooms: parseInt(document.getElementById('desc_bedrooms').value),
-                            bathrooms: parseFloat(document.getElementById('desc_bathrooms').value),
-                            sqft: parseInt(document.getElementById('desc_sqft').value),
-                            price: parseInt(document.getElementById('desc_price').value),
-                            year_built: parseInt(document.getElementById('desc_year_built').value),
-                            features: document.getElementById('desc_features').value.split(',').map(f => f.trim()),
-                            neighborhood: document.getElementById('desc_neighborhood').value
-                        })
-                    });
-
-                    const data = await response.json();
-                    if (response.ok) {
-                        output.textContent = data.description;
-                        output.classList.add('active');
-                    } else {
-                        error.textContent = data.detail || 'Error generating description';
-                        error.classList.add('active');
-                    }
-                } catch (err) {
-                    error.textContent = 'Error: ' + err.message;
-                    error.classList.add('active');
-                } finally {
-                    loading.classList.remove('active');
-                }
-            }
-
-            async function generateCMA(e) {
-                e.preventDefault();
-                const output = document.getElementById('cma_output');
-                const loading = document.getElementById('cma_loading');
-                const error = document.getElementById('cma_error');
-
-                loading.classList.add('active');
-                error.classList.remove('active');
-                output.classList.remove('active');
-
-                try {
-                    const response = await fetch('/api/generate-cma', {
-                        method: 'POST',
-                        headers: {'Content-Type': 'application/json'},
-                        body: JSON.stringify({
-                            comparable_sales: JSON.parse(document.getElementById('cma_comparables').value)
-                        })
-                    });
-
-                    const data = await response.json();
-                    if (response.ok) {
-                        output.textContent = data.cma;
-                        output.classList.add('active');
-                    } else {
-                        error.textContent = data.detail || 'Error generating CMA';
-                        error.classList.add('active');
-                    }
-                } catch (err) {
-                    error.textContent = 'Error: ' + err.message;
-                    error.classList.add('active');
-                } finally {
-                    loading.classList.remove('active');
-                }
-            }
-
-            async function generateEmail(e) {
-                e.preventDefault();
-                const output = document.getElementById('email_output');
-                const loading = document.getElementById('email_loading');
-                const error = document.getElementById('email_error');
-
-                loading.classList.add('active');
-                error.classList.remove('active');
-                output.classList.remove('active');
-
-                try {
-                    const response = await fetch('/api/generate-email', {
-                        method: 'POST',
-                        headers: {'Content-Type': 'application/json'},
-                        body: JSON.stringify({
-                            agent_name: document.getElementById('email_agent_name').value,
-                            buyer_profile: JSON.parse(document.getElementById('email_buyer_profile').value)
-                        })
-                    });
-
-                    const data = await response.json();
-                    if (response.ok) {
-                        output.textContent = data.email;
-                        output.classList.add('active');
-                    } else {
-                        error.textContent = data.detail || 'Error generating email';
-                        error.classList.add('active');
-                    }
-                } catch (err) {
-                    error.textContent = 'Error: ' + err.message;
-                    error.classList.add('active');
-                } finally {
-                    loading.classList.remove('active');
-                }
-            }
-        </script>
-    </body>
-    </html>
-    """
+@lru_cache(maxsize=256)
+def _fmt_comp_rows(rows: tuple) -> str:
+    """Format a hashable snapshot of comparable rows; memoized because
+    users iterating on a CMA resubmit the same comp set repeatedly"""
+    return "\n".join(_CMA_ROW(dict(row)) for row in rows)
+
+def _format_comparables(comparable_sales: list) -> str:
+    """Render structured comparable sales into prompt rows (server-side path)"""
+    rows = tuple(tuple(sorted(row.items())) for row in comparable_sales)
+    try:
+        return _fmt_comp_rows(rows)
+    except TypeError:  # unhashable field values; format without memoizing
+        return "\n".join(map(_CMA_ROW, comparable_sales))
+
+def _build_cma_messages(comparables_text: str) -> list:
+    """Build the Comparative Market Analysis messages (cacheable system + dynamic user)"""
+    return [
+        _system_block(STATIC_CMA_PROMPT),
+        {"role": "user", "content": f"COMPARABLE SALES:\n{comparables_text}"},
+    ]
+
+async def generate_cma(comparables_text: str) -> str:
+    """Generate Comparative Market Analysis"""
+    try:
+        return await call_claude(_build_cma_messages(comparables_text))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to generate CMA: {str(e)}")
+
+def _build_email_messages(agent_name: str, buyer_profile: dict) -> list:
+    """Build the follow-up email messages (cacheable system + dynamic user)"""
+    fields = defaultdict(lambda: "N/A", buyer_profile)
+    fields["agent_name"] = agent_name
+    fields["budget_str"] = _safe_price(buyer_profile.get("budget"))
+    profile = _EMAIL_FILL(fields)
+    return [_system_block(STATIC_EMAIL_PROMPT), {"role": "user", "content": profile}]
+
+async def generate_followup_email(agent_name: str, buyer_profile: dict) -> str:
+    """Generate personalized follow-up email"""
+    try:
+        return await call_claude(_build_email_messages(agent_name, buyer_profile))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to generate email: {str(e)}")
 
 @app.post("/api/generate-description")
-async def api_generate_description(request: dict):
+async def api_generate_description(body: ListingIn):
     """Generate listing description"""
-    description = await generate_description(request)
-    return JSONResponse({"description": description})
+    description = await generate_description(body.model_dump(exclude_none=True))
+    return {"description": description}
+
+@app.post("/api/generate-description/stream")
+async def api_generate_description_stream(body: ListingIn):
+    """Generate listing description, streamed to the browser as SSE"""
+    messages = _build_description_messages(body.model_dump(exclude_none=True))
+    return StreamingResponse(call_claude_stream(messages), media_type="text/event-stream")
 
 @app.post("/api/generate-cma")
-async def api_generate_cma(request: dict):
-    """Generate CMA report"""
-    cma = await generate_cma(request.get("comparable_sales", []))
-    return JSONResponse({"cma": cma})
+async def api_generate_cma(body: CMAIn):
+    """Generate CMA report
+
+    The dashboard pre-formats rows and sends comparables_text; structured
+    comparable_sales is still accepted for older clients.
+    """
+    comparables_text = body.comparables_text
+    if comparables_text is None:
+        comparables_text = _format_comparables([c.model_dump() for c in body.comparable_sales])
+    cma = await generate_cma(comparables_text)
+    return {"cma": cma}
+
+@app.post("/api/generate-all")
+async def api_generate_all(body: GenerateAllIn):
+    """Generate description, CMA, and email in one concurrent round trip"""
+    comparables = body.comparable_sales or body.comparables
+    prompts = [
+        _build_description_messages(body.listing.model_dump(exclude_none=True)),
+        _build_cma_messages(_format_comparables([c.model_dump() for c in comparables])),
+        _build_email_messages(
+            body.agent_name,
+            body.buyer_profile.model_dump(exclude_none=True),
+        ),
+    ]
+    results = await call_claude_batch(prompts)
+
+    payload = {}
+    for key, result in zip(("description", "cma", "email"), results):
+        if isinstance(result, Exception):
+            payload[key] = None
+            payload[f"{key}_error"] = str(result)
+        else:
+            payload[key] = result
+    return payload
 
 @app.post("/api/generate-email")
-async def api_generate_email(request: dict):
+async def api_generate_email(body: EmailIn):
     """Generate follow-up email"""
     email = await generate_followup_email(
-        request.get("agent_name", "Agent"),
-        request.get("buyer_profile", {})
+        body.agent_name,
+        body.buyer_profile.model_dump(exclude_none=True),
     )
-    return JSONResponse({"email": email})
+    return {"email": email}
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with immutable cache headers; asset URLs carry content hashes"""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+class SiteFiles(StaticFiles):
+    """Root site mount; short max-age since index.html is not hash-busted"""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=3600"
+        return response
+
+# Mounts come after the API routes so those keep precedence; the root
+# mount serves the page built at startup, with StaticFiles' own
+# ETag/If-None-Match handling covering conditional requests.
+app.mount("/static", CachedStaticFiles(directory=STATIC_DIR), name="static")
+app.mount("/", SiteFiles(directory=SITE_DIR, html=True, check_dir=False), name="site")
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    uvicorn.run(
+        "realtor_mvp:app",
+        host="0.0.0.0",
+        port=port,
+        workers=int(os.getenv("WEB_CONCURRENCY", max(2, (os.cpu_count() or 2) // 2))),
+        loop="uvloop",
+        http="httptools",
+        log_level="info",
+    )
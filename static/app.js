@@ -0,0 +1,115 @@
+async function generateDescription(e) {
+    e.preventDefault();
+    const output = document.getElementById('desc_output');
+    const loading = document.getElementById('desc_loading');
+    const error = document.getElementById('desc_error');
+
+    loading.classList.add('active');
+    error.classList.remove('active');
+    output.classList.remove('active');
+
+    try {
+        const response = await fetch('/api/generate-description/stream', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({
+                address: document.getElementById('desc_address').value,
+                bedrooms: parseInt(document.getElementById('desc_bedrooms').value),
+                bathrooms: parseFloat(document.getElementById('desc_bathrooms').value),
+                sqft: parseInt(document.getElementById('desc_sqft').value),
+                price: parseInt(document.getElementById('desc_price').value),
+                year_built: parseInt(document.getElementById('desc_year_built').value),
+                features: document.getElementById('desc_features').value.split(',').map(f => f.trim()),
+                neighborhood: document.getElementById('desc_neighborhood').value
+            })
+        });
+
+        if (!response.ok) {
+            const data = await response.json();
+            error.textContent = data.detail || 'Error generating description';
+            error.classList.add('active');
+            return;
+        }
+
+        // Render SSE frames as they arrive instead of waiting for the
+        // full completion (EventSource can't POST, so read the body stream).
+        output.textContent = '';
+        output.classList.add('active');
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const frames = buffer.split('\n\n');
+            buffer = frames.pop();
+            for (const frame of frames) {
+                if (!frame.startsWith('data: ')) continue;
+                const payload = frame.slice(6);
+                if (payload === '[DONE]') continue;
+                output.textContent += JSON.parse(payload).text;
+            }
+        }
+    } catch (err) {
+        error.textContent = 'Error: ' + err.message;
+        error.classList.add('active');
+    } finally {
+        loading.classList.remove('active');
+    }
+}
+
+// Shared driver for the non-streaming generators: same loading/error/
+// output choreography, different payload and response field.
+async function run(prefix, url, buildPayload, field) {
+    const output = document.getElementById(prefix + '_output');
+    const loading = document.getElementById(prefix + '_loading');
+    const error = document.getElementById(prefix + '_error');
+
+    loading.classList.add('active');
+    error.classList.remove('active');
+    output.classList.remove('active');
+
+    try {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify(buildPayload())
+        });
+
+        const data = await response.json();
+        if (response.ok) {
+            output.textContent = data[field];
+            output.classList.add('active');
+        } else {
+            error.textContent = data.detail || ('Error generating ' + field);
+            error.classList.add('active');
+        }
+    } catch (err) {
+        error.textContent = 'Error: ' + err.message;
+        error.classList.add('active');
+    } finally {
+        loading.classList.remove('active');
+    }
+}
+
+async function generateCMA(e) {
+    e.preventDefault();
+    await run('cma', '/api/generate-cma', () => {
+        // Format comparable rows here so the server substitutes one string
+        // instead of re-formatting every row per request.
+        const comps = JSON.parse(document.getElementById('cma_comparables').value);
+        const comparablesText = comps.map(c =>
+            `- ${c.address}: $${c.price.toLocaleString()} (${c.sqft} sqft, ${c.beds} bed, ${c.baths} bath)`
+        ).join('\n');
+        return {comparables_text: comparablesText};
+    }, 'cma');
+}
+
+async function generateEmail(e) {
+    e.preventDefault();
+    await run('email', '/api/generate-email', () => ({
+        agent_name: document.getElementById('email_agent_name').value,
+        buyer_profile: JSON.parse(document.getElementById('email_buyer_profile').value)
+    }), 'email');
+}